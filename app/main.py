@@ -1,9 +1,66 @@
 # app/main.py
-from fastapi import FastAPI
+from datetime import datetime
+
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
 from app.routes.expenses import router as expenses_router
+from app.services.executor import create_executor
+from app.services.parser import nlp, parse_sms_spacy
 
 app = FastAPI(title="Financial App Backend - MVP Phase 1")
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
 # Register all routes
 app.include_router(expenses_router, prefix="/api")
 
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    # Same envelope as the msgspec-validated single-SMS route, instead of FastAPI's {"detail": [...]}
+    error = "; ".join(
+        f"{err['msg']} - at `{'.'.join(str(part) for part in err['loc'][1:])}`" for err in exc.errors()
+    )
+    return Response(
+        orjson.dumps({"success": False, "error": error}), status_code=422, media_type="application/json"
+    )
+
+
+# Health check hit by load balancers; served as a plain Starlette route with a
+# prebuilt response to skip FastAPI's validation and serialization
+PING_RESPONSE = Response(
+    b'{"status":"Server is running"}',
+    media_type="application/json",
+    headers={"Cache-Control": "no-store"}
+)
+
+
+async def health_check(request):
+    return PING_RESPONSE
+
+
+app.add_route("/api/ping", health_check, methods=["GET"])
+
+
+@app.on_event("startup")
+def warm_parser():
+    # Run the spaCy pipeline and the parser once before accepting traffic; parser
+    # workers are forked lazily afterwards and inherit the warmed-up model. The
+    # pipeline is called directly because most SMS (including this one) are
+    # parsed without ever reaching an NLP step
+    nlp("Rs 100 paid to warmup")
+    parse_sms_spacy("warmup", datetime.now())
+
+
+@app.on_event("startup")
+def start_executor():
+    # Created per server process rather than at import, so a gunicorn master
+    # preloading the app doesn't share one pool's pipes across its workers
+    app.state.executor = create_executor()
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    app.state.executor.shutdown(wait=False)
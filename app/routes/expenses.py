@@ -1,39 +1,136 @@
 # routes/expenses.py
+import asyncio
+import cachetools
+import msgspec
+import orjson
+import xxhash
+from concurrent.futures.process import BrokenProcessPool
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
-from datetime import datetime
-from app.services.parser import parse_sms_spacy
-from typing import Optional, Dict
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from datetime import date, datetime
+from app.services.parser import parse_sms_spacy, parse_sms_batch, SMSParseError
+from app.services.cache import LRUCache, normalize_message
+from app.services.executor import create_executor
+from typing import Annotated, Optional
 
 router = APIRouter()
 
-class SMSInput(BaseModel):
-    sms_text: str
-from app.services.parser import parse_sms_spacy
+# Parsed results keyed on (normalized message, SMS date); bank templates repeat a lot
+PARSE_CACHE = LRUCache(maxsize=4096)
 
-router = APIRouter()
+# Serialized responses for request bodies seen in the last minute; mobile clients
+# re-POST the same SMS when they retry
+RECENT_RESPONSES = cachetools.TTLCache(maxsize=10_000, ttl=60)
+
+
+class SMSStruct(msgspec.Struct):
+    # Bounded so pathological payloads are rejected before they reach spaCy
+    message: Annotated[str, msgspec.Meta(max_length=2048)]
+    timestamp: Optional[datetime] = None
+
+
+# Decoded with msgspec rather than Pydantic: the hot single-SMS route validates in
+# C straight from the body bytes. strict=False also accepts Unix epoch timestamps.
+_SMS_DECODER = msgspec.json.Decoder(SMSStruct, strict=False)
+_SMS_SCHEMA = msgspec.json.schema_components([SMSStruct])[1]["SMSStruct"]
+
+
+def _json_response(content, status_code: int = 200) -> Response:
+    # Serialized with orjson up front; FastAPI's ORJSONResponse is deprecated
+    return Response(orjson.dumps(content), status_code=status_code, media_type="application/json")
 
-@router.get("/ping")
-def health_check():
-    return {"status": "Server is running"}
 
+async def _run_parser(app, fn, *args):
+    """Run fn in the app's parser pool, replacing the pool if a worker died"""
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        executor = app.state.executor
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A killed worker (OOM, native crash) breaks the pool for good; only
+            # the first request to notice swaps it, the others just retry
+            if app.state.executor is executor:
+                app.state.executor = create_executor()
+                executor.shutdown(wait=False)
+            if attempt:
+                raise
 
 
+SMSMessage = Annotated[str, StringConstraints(strip_whitespace=True, max_length=2048)]
 
 
-from app.services.parser import parse_sms_spacy, SMSParseError
+class SMSBatchRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
 
+    messages: list[SMSMessage] = Field(max_length=1000)
+    timestamp: Optional[datetime] = None
 
-class SMSRequest(BaseModel):
-    message: str
-    timestamp: datetime = datetime.now()
 
-@router.post("/parse_expense")
-async def parse_expense(sms: SMSRequest):
+@router.post(
+    "/parse_expense",
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": _SMS_SCHEMA}}}}
+)
+async def parse_expense(request: Request):
+    body = await request.body()
+    body_key = xxhash.xxh3_64_intdigest(body)
+    if (cached := RECENT_RESPONSES.get(body_key)) is not None:
+        return Response(cached, media_type="application/json")
+
+    try:
+        sms = _SMS_DECODER.decode(body)
+    except msgspec.DecodeError as e:
+        return _json_response({"success": False, "error": str(e)}, status_code=422)
     try:
-        parsed_data = parse_sms_spacy(sms.message, sms.timestamp)
-        return {"success": True, "data": parsed_data}
+        message = normalize_message(sms.message)
+        # Only the date of the timestamp affects the parse result; without one the
+        # parser falls back to today's date
+        cache_key = (message, sms.timestamp.date() if sms.timestamp else date.today())
+        parsed = PARSE_CACHE.get(cache_key)
+        if parsed is None:
+            # Parse in a worker process; spaCy is CPU-bound and would stall the event loop
+            parsed = await _run_parser(request.app, parse_sms_spacy, message, sms.timestamp)
+            PARSE_CACHE.put(cache_key, parsed)
+        parsed_data = {
+            **parsed,
+            "raw_text": sms.message,
+            "description": sms.message,
+            "timestamp": datetime.now().isoformat()
+        }
+        response = _json_response({"success": True, "data": parsed_data})
+        RECENT_RESPONSES[body_key] = response.body
+        return response
     except SMSParseError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        # Unparseable SMS is an expected outcome, not an exceptional one
+        return _json_response({"success": False, "error": str(e)}, status_code=400)
+    except BrokenProcessPool:
+        # A worker died on the retry too; the next request gets a fresh pool
+        return _json_response({"success": False, "error": "Parser unavailable, please retry"}, status_code=503)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/parse_expense_batch")
+async def parse_expense_batch(batch: SMSBatchRequest, request: Request):
+    try:
+        # One executor round-trip for the whole batch instead of one per SMS
+        parsed = await _run_parser(
+            request.app, parse_sms_batch, batch.messages, [batch.timestamp] * len(batch.messages)
+        )
+        results = [
+            {"success": False, "error": str(item)} if isinstance(item, SMSParseError)
+            else {"success": True, "data": item}
+            for item in parsed
+        ]
+        return _json_response({"success": True, "results": results})
+    except BrokenProcessPool:
+        # A worker died on the retry too; the next request gets a fresh pool
+        return _json_response({"success": False, "error": "Parser unavailable, please retry"}, status_code=503)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/cache_stats")
+def cache_stats():
+    return _json_response(PARSE_CACHE.cache_info()._asdict())
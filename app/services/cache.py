@@ -0,0 +1,51 @@
+# app/services/cache.py
+import re
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+def normalize_message(text: str) -> str:
+    """Collapse whitespace so re-sent or re-wrapped SMS share a cache entry"""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache for parsed SMS results
+
+    Unlike functools.lru_cache, entries are filled explicitly, so the parse itself
+    can run in a worker process while lookups stay on the event loop.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Dict]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Dict) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
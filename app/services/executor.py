@@ -0,0 +1,16 @@
+# app/services/executor.py
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+# Workers for the CPU-bound SMS parser, so it never blocks the event loop.
+# "process" (default) sidesteps the GIL; "thread" avoids forking the spaCy model
+# but parses share one interpreter and parse_sms_spacy must stay thread-safe.
+PARSE_EXECUTOR = os.getenv("FINAPP_PARSE_EXECUTOR", "process")
+PARSE_WORKERS = int(os.getenv("FINAPP_PARSE_WORKERS", os.cpu_count() or 1))
+
+
+def create_executor() -> Executor:
+    """Build a parser pool as configured by FINAPP_PARSE_EXECUTOR/FINAPP_PARSE_WORKERS"""
+    if PARSE_EXECUTOR == "thread":
+        return ThreadPoolExecutor(max_workers=PARSE_WORKERS)
+    return ProcessPoolExecutor(max_workers=PARSE_WORKERS)
@@ -0,0 +1,101 @@
+# app/services/fast_templates.py
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Match, Optional, Tuple
+
+# Deterministic fast path for well-known bank/UPI SMS templates. A template hit
+# skips the spaCy pipeline entirely; anything that doesn't match exactly falls
+# back to the universal parser.
+
+_AMOUNT = r"(?P<amount>\d[\d,]*(?:\.\d{1,2})?)"
+_ACCOUNT = r"a/c\s+(?:no\.?\s*)?[x*]*\d{3,}"
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+
+_DATE_NUMERIC = re.compile(r"(\d{1,2})[-/.](\d{1,2})[-/.](\d{2}|\d{4})$")
+_DATE_COMPACT = re.compile(r"(\d{1,2})([a-z]{3})(\d{2}|\d{4})$", re.IGNORECASE)
+
+
+def _to_iso_date(date_text: str) -> Optional[str]:
+    """Convert a day-first numeric (15-01-25) or compact (15Jan25) date to YYYY-MM-DD"""
+    if match := _DATE_NUMERIC.match(date_text):
+        day, month, year = (int(part) for part in match.groups())
+    elif match := _DATE_COMPACT.match(date_text):
+        month = _MONTHS.get(match.group(2).lower())
+        if month is None:
+            return None
+        day, year = int(match.group(1)), int(match.group(3))
+    else:
+        return None
+
+    if year < 100:
+        year += 2000 if year < 50 else 1900
+    try:
+        return datetime(year, month, day).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _extract_fields(category: str, match: Match) -> Optional[Dict]:
+    amount = float(match.group("amount").replace(",", ""))
+    date = _to_iso_date(match.group("date"))
+    if not 1 <= amount <= 10_000_000 or date is None:
+        return None
+
+    return {
+        "category": category,
+        "subcategory": "upi",
+        "amount": amount,
+        "currency": "INR",
+        "merchant": match.group("merchant").strip(" .").title(),
+        "date": date,
+        "confidence": 0.95
+    }
+
+
+def _upi_debit(match: Match) -> Optional[Dict]:
+    return _extract_fields("debit", match)
+
+
+def _upi_credit(match: Match) -> Optional[Dict]:
+    return _extract_fields("credit", match)
+
+
+# (pattern, extractor) pairs, tried in order and compiled once at import
+PATTERNS: List[Tuple[re.Pattern, Callable[[Match], Optional[Dict]]]] = [
+    # Sent Rs.200.00 From HDFC Bank A/C *1234 To RAMESH On 01/01/25 Ref 412345678901
+    (re.compile(
+        rf"sent\s+(?:rs\.?|inr)\s*{_AMOUNT}\s+from\s+[a-z ]+?\s+{_ACCOUNT}\s+"
+        r"to\s+(?P<merchant>[a-z0-9 .&'-]{2,40}?)\s+on\s+(?P<date>\d{1,2}[-/]\d{1,2}[-/]\d{2,4})\s+ref\b",
+        re.IGNORECASE
+    ), _upi_debit),
+    # Dear UPI user A/C X1234 debited by 150.0 on date 01Jan25 trf to SWIGGY Refno 412345678901
+    (re.compile(
+        rf"dear\s+upi\s+user\s+{_ACCOUNT}\s+debited\s+by\s+{_AMOUNT}\s+on\s+date\s+"
+        r"(?P<date>\d{1,2}[a-z]{3}\d{2,4})\s+trf\s+to\s+(?P<merchant>[a-z0-9 .&'-]{2,40}?)\s+refno\b",
+        re.IGNORECASE
+    ), _upi_debit),
+    # Received Rs.500.00 in your Kotak Bank A/c X1234 from RAMESH on 15-01-25.UPI Ref:412345678901
+    (re.compile(
+        rf"received\s+(?:rs\.?|inr)\s*{_AMOUNT}\s+in\s+your\s+[a-z ]+?\s+{_ACCOUNT}\s+"
+        r"from\s+(?P<merchant>[a-z0-9 .&'@-]{2,40}?)\s+on\s+(?P<date>\d{1,2}[-/]\d{1,2}[-/]\d{2,4})\s*\.?\s*upi\s+ref\b",
+        re.IGNORECASE
+    ), _upi_credit),
+]
+
+
+def match_template(sms_text: str) -> Optional[Dict]:
+    """
+    Try the known SMS templates against the message
+
+    Returns the core transaction fields (category, subcategory, amount, currency,
+    merchant, date, confidence) on a hit, or None to use the full parser
+    """
+    for pattern, extractor in PATTERNS:
+        if match := pattern.match(sms_text):
+            if fields := extractor(match):
+                return fields
+    return None
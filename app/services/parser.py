@@ -1,14 +1,68 @@
 # app/services/parser_spacy.py
+import os
+import ahocorasick
+import numpy as np
 import spacy
+import threading
+from functools import lru_cache
 from datetime import datetime, timedelta
 import re
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+from spacy.attrs import ENT_TYPE, LIKE_NUM
+from spacy.tokens import Doc
+from app.services.fast_templates import match_template
+
+# spaCy model to load. The parser uses tags, lemmas, the dependency parse and
+# entities but never word vectors, so the small model is enough. When unset, the
+# larger models that earlier installs downloaded are tried if sm is missing; an
+# explicitly configured model is loaded as-is, with no fallback
+SPACY_MODEL = os.getenv("FINAPP_SPACY_MODEL")
+SPACY_MODEL_FALLBACKS = ("en_core_web_sm", "en_core_web_lg", "en_core_web_md")
+
+# Optional cap on the static word-vector table (md/lg models only). Pruned words
+# are remapped to their nearest remaining vector, trading a little accuracy for a
+# much smaller model (en_core_web_lg ships ~500k vectors). Pruning runs once, on
+# the shared pipeline loaded at import; parser threads copy that pipeline rather
+# than reloading it.
+SPACY_PRUNE_VECTORS = int(os.getenv("FINAPP_SPACY_PRUNE_VECTORS", "0"))
+
+# Number of SMS handed to spaCy at a time by parse_sms_batch
+SPACY_BATCH_SIZE = int(os.getenv("FINAPP_SPACY_BATCH_SIZE", "64"))
 
 # Load spaCy model with error handling
-try:
-    nlp = spacy.load("en_core_web_lg")
-except OSError:
-    nlp = spacy.load("en_core_web_md")
+def _load_nlp():
+    if SPACY_MODEL:
+        model = spacy.load(SPACY_MODEL)
+    else:
+        for name in SPACY_MODEL_FALLBACKS:
+            try:
+                model = spacy.load(name)
+                break
+            except OSError:
+                if name == SPACY_MODEL_FALLBACKS[-1]:
+                    raise
+    if SPACY_PRUNE_VECTORS and model.vocab.vectors.shape[0] > SPACY_PRUNE_VECTORS:
+        model.vocab.prune_vectors(SPACY_PRUNE_VECTORS)
+    return model
+
+nlp = _load_nlp()
+
+# spaCy pipelines aren't fully thread-safe, so each parser thread gets its own
+# copy; the importing thread (and processes forked from it) reuse `nlp`
+_tls = threading.local()
+_tls.nlp = nlp
+
+@lru_cache(maxsize=1)
+def _nlp_bytes() -> bytes:
+    """Serialized shared pipeline (including any pruned vectors), built once"""
+    return nlp.to_bytes()
+
+def _nlp():
+    """Return the calling thread's spaCy pipeline, copying the shared one on first use"""
+    if not hasattr(_tls, "nlp"):
+        model = spacy.util.get_lang_class(nlp.config["nlp"]["lang"]).from_config(nlp.config)
+        _tls.nlp = model.from_bytes(_nlp_bytes())
+    return _tls.nlp
 
 # Comprehensive financial entity patterns
 FINANCIAL_PATTERNS = {
@@ -25,8 +79,12 @@ FINANCIAL_PATTERNS = {
     "date_compact": re.compile(r"(\d{1,2})([a-z]{3})(\d{2,4})", re.IGNORECASE),
     "date_standard": re.compile(r"(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})", re.IGNORECASE),
     "date_verbose": re.compile(r"(\d{1,2})\s+([a-z]{3,9})\s+(\d{4})", re.IGNORECASE),
+    # Includes the inflections of the transaction verbs (pay, send, transfer, spend,
+    # use, purchase, withdraw, recharge) so no spaCy lemmatization is needed
     "transaction_indicators": re.compile(
-        r"\b(debited|credited|paid|sent|received|transfer|recharge|withdrawn|billed|utilized|charged|repayment|emi|purchase)\b",
+        r"\b(debited|credited|paid|pays?|paying|sent|sends?|sending|received|"
+        r"transfer(?:s|red|ring)?|spend(?:s|ing)?|spent|use[sd]?|using|purchas(?:e|es|ed|ing)|"
+        r"withdraw(?:s|n|ing)?|withdrew|recharg(?:e|es|ed|ing)|billed|utilized|charged|repayment|emi)\b",
         re.IGNORECASE
     )
 }
@@ -146,22 +204,20 @@ TRANSACTION_CATEGORIES = {
     }
 }
 
-# Merchant blacklists
-MERCHANT_BLACKLIST = {
+# Merchant blacklists (lowercase; candidates are lowercased before lookup)
+MERCHANT_BLACKLIST: FrozenSet[str] = frozenset({
     "bank", "account", "a/c", "savings", "current", "balance", "available",
     "wallet", "upi", "refno", "reference", "id", "user", "app", "details",
-    "call", "if not", "not you", "please", "contact", "customer care",
-    "mobile", "recharge", "validity", "prepaid", "postpaid", "plan",
-    "transaction", "amount", "rs", "inr", "usd", "aed", "eur", "date",
-    "time", "location", "terminal", "pos", "card", "credit", "debit",
-    "payment", "transfer", "to", "from", "at", "on", "for", "your",
-    "account", "acc", "a/c", "xxx", "xx", "xxxx", "****", "card",
-    "cardnumber", "crd", "crdno", "cardno", "card number", "cvv",
-    "expiry", "exp", "valid", "thru", "thru date", "mm/yy", "mm/yy",
-    "thank", "thanks", "regards", "team", "banking", "online", "app",
-    "sms", "message", "alert", "notification", "service", "charges",
-    "fund", "securities", "balance", "bal", "reported", "excludes"
-}
+    "call", "if not", "not you", "please", "contact", "customer care", "mobile",
+    "recharge", "validity", "prepaid", "postpaid", "plan", "transaction",
+    "amount", "rs", "inr", "usd", "aed", "eur", "date", "time", "location",
+    "terminal", "pos", "card", "credit", "debit", "payment", "transfer", "to",
+    "from", "at", "on", "for", "your", "acc", "xxx", "xx", "xxxx", "****",
+    "cardnumber", "crd", "crdno", "cardno", "card number", "cvv", "expiry",
+    "exp", "valid", "thru", "thru date", "mm/yy", "thank", "thanks", "regards",
+    "team", "banking", "online", "sms", "message", "alert", "notification",
+    "service", "charges", "fund", "securities", "bal", "reported", "excludes"
+})
 
 # Global currency mapping
 CURRENCY_CODES = {
@@ -174,131 +230,283 @@ CURRENCY_CODES = {
     "jpy": "JPY", "¥": "JPY", "yen": "JPY"
 }
 
+def _build_category_automaton() -> ahocorasick.Automaton:
+    """
+    Index every category keyword, exception and provider alias in one Aho-Corasick
+    automaton, so a single pass over the SMS finds all of them
+
+    Each phrase maps to a tuple of (category, role, payload) entries, since the
+    same phrase can belong to several categories (e.g. "emi" for loan and emi)
+    """
+    entries: Dict[str, List[Tuple[str, str, str]]] = {}
+    for category, config in TRANSACTION_CATEGORIES.items():
+        for kw in config.get("keywords", []):
+            entries.setdefault(kw, []).append((category, "keyword", kw))
+        for exc in config.get("exceptions", []):
+            entries.setdefault(exc, []).append((category, "exception", exc))
+        providers = config.get("providers", [])
+        if isinstance(providers, dict):
+            for provider, aliases in providers.items():
+                for alias in aliases:
+                    entries.setdefault(alias.lower(), []).append((category, "provider", provider))
+        else:
+            for provider in providers:
+                entries.setdefault(provider, []).append((category, "provider", provider))
+    
+    automaton = ahocorasick.Automaton()
+    for phrase, values in entries.items():
+        automaton.add_word(phrase, tuple(values))
+    automaton.make_automaton()
+    return automaton
+
+CATEGORY_AUTOMATON = _build_category_automaton()
+
+# Provider names extract_merchant reports per category, in priority order
+MERCHANT_PROVIDERS: Dict[str, List[str]] = {
+    "recharge": TRANSACTION_CATEGORIES["recharge"]["providers"],
+    "insurance": TRANSACTION_CATEGORIES["insurance"]["providers"],
+    "investment": ["groww", "coin", "zerodha", "upstox", "mf utility"]
+}
+
+def _build_provider_automaton() -> ahocorasick.Automaton:
+    """Index every merchant provider name, so one pass finds all that an SMS mentions"""
+    automaton = ahocorasick.Automaton()
+    for providers in MERCHANT_PROVIDERS.values():
+        for provider in providers:
+            automaton.add_word(provider, provider)
+    automaton.make_automaton()
+    return automaton
+
+PROVIDER_AUTOMATON = _build_provider_automaton()
+
+def _find_provider(category: str, text_lower: str) -> Optional[str]:
+    """Return the highest-priority provider of the category mentioned in the SMS"""
+    mentioned = {provider for _, provider in PROVIDER_AUTOMATON.iter(text_lower)}
+    return next((p for p in MERCHANT_PROVIDERS[category] if p in mentioned), None)
+
+# Digit runs that appear inside a keyword or alias (e.g. "kotak 811"); these have to
+# reach detect_category verbatim, so such SMS are not digit-masked for caching
+_KEYWORD_DIGITS = frozenset(
+    run for phrase in CATEGORY_AUTOMATON.keys() for run in re.findall(r"\d+", phrase)
+)
+
+def _build_currency_automaton() -> ahocorasick.Automaton:
+    """Index every currency name/symbol in CURRENCY_CODES, keyed back to itself"""
+    automaton = ahocorasick.Automaton()
+    for currency_name in CURRENCY_CODES:
+        automaton.add_word(currency_name, currency_name)
+    automaton.make_automaton()
+    return automaton
+
+CURRENCY_AUTOMATON = _build_currency_automaton()
+_CURRENCY_PRIORITY = {currency_name: i for i, currency_name in enumerate(CURRENCY_CODES)}
+
+def _detect_currency(text_lower: str) -> str:
+    """Return the ISO code of the highest-priority currency in the SMS, INR if none
+
+    Names only count as whole words, so "eureka" or "europe" never read as EUR:
+
+    >>> _detect_currency("eureka forbes emi of rs 1,500 debited from a/c xx1234")
+    'INR'
+    """
+    best = None
+    for end, currency_name in CURRENCY_AUTOMATON.iter(text_lower):
+        start = end - len(currency_name) + 1
+        # Symbols match anywhere; alphabetic names need a non-letter on both sides
+        if not currency_name[0].isalpha() or (
+            (start == 0 or not text_lower[start - 1].isalpha())
+            and (end + 1 == len(text_lower) or not text_lower[end + 1].isalpha())
+        ):
+            if best is None or _CURRENCY_PRIORITY[currency_name] < _CURRENCY_PRIORITY[best]:
+                best = currency_name
+    return CURRENCY_CODES[best] if best else "INR"
+
+# Each category's context phrases folded into one compiled alternation, so the
+# context check is a single regex scan instead of a re.search per phrase
+CATEGORY_CONTEXT_REGEX: Dict[str, re.Pattern] = {
+    category: re.compile("|".join(f"(?:{phrase})" for phrase in config["context_phrases"]))
+    for category, config in TRANSACTION_CATEGORIES.items()
+    if "context_phrases" in config
+}
+
+# Categories checked before the basic credit/debit split, in priority order
+_SPECIALIZED_CATEGORIES: Tuple[str, ...] = tuple(
+    category for category in TRANSACTION_CATEGORIES
+    if category not in ("credit", "debit", "informational")
+)
+_LOAN_PROVIDERS: Tuple[str, ...] = tuple(TRANSACTION_CATEGORIES["loan"]["providers"])
+
+# Patterns used by the extractors, compiled once at import instead of per call
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_DIGIT = re.compile(r"\d")
+_WHITESPACE = re.compile(r"\s+")
+# Words an amount usually follows ("debited by", "Rs"). The right side only rules
+# out letters, so run-together forms like "Rs500" still count
+_AMOUNT_INDICATOR_PAT = re.compile(r"\b(?:by|of|for|rs|inr|amount|charged|debited|credited)(?![a-z])")
+_NUMBER = re.compile(r"\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{1,2})?")
+_AMOUNT_PAT = re.compile(r"(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?|\d+\.\d{1,2}|\d+)")
+_AMOUNT_FALLBACK_PAT = re.compile(r"(?:rs\.?\s*|inr\s*)(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?)\b")
+_NON_NUMERIC = re.compile(r"[^\d.]")
+_SINGLE_LETTER = re.compile(r"^[a-zA-Z]$")
+
+# ENT_TYPE value of DATE entities, as returned by Doc.to_array
+_DATE_ENT_TYPE = nlp.vocab.strings["DATE"]
+_APP_NAME_PAT = re.compile(r"on your ([a-zA-Z]+) App", re.IGNORECASE)
+_ONLY_ON_PAT = re.compile(r"only on ([a-zA-Z]+)", re.IGNORECASE)
+_INSTITUTION_PAT = re.compile(r"^([A-Z\s]+) on")
+_UPI_PATS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r"trf\s+to\s+([a-zA-Z0-9\s]{3,30})",
+        r"sent\s+to\s+([a-zA-Z0-9\s]{3,30})",
+        r"paid\s+to\s+([a-zA-Z0-9\s]{3,30})",
+        r"transfer\s+to\s+([a-zA-Z0-9\s]{3,30})"
+    )
+]
+_UPI_REF_SUFFIX = re.compile(r"\s+Ref.*$")
+_UPI_ID_SUFFIX = re.compile(r"\s+(?:UPI|ref|id|crn).*")
+_MERCHANT_STOPWORDS = re.compile(r"\b(?:ref|id|user|upi|rs|inr|amount|charged)\b.*", re.IGNORECASE)
+_REF_SEPARATOR = re.compile(r"[:\-\s]+")
+
+# Month lookups for extract_date: abbreviations (what %b accepts) and, for
+# verbose dates, full names as well (%B)
+_MONTH_NAMES = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december"
+]
+_MONTH_ABBR = {name[:3]: number for number, name in enumerate(_MONTH_NAMES, 1)}
+_MONTHS = {**_MONTH_ABBR, **{name: number for number, name in enumerate(_MONTH_NAMES, 1)}}
+
+class LazyDoc:
+    """
+    Runs the spaCy pipeline over an SMS on first use and reuses the Doc afterwards
+
+    Most SMS are resolved by the regex/keyword steps alone, so the pipeline only
+    runs (once) for messages that actually reach an NLP fallback.
+    """
+    __slots__ = ("text", "_doc")
+    
+    def __init__(self, text: str, doc: Optional[Doc] = None):
+        self.text = text
+        self._doc = doc
+    
+    def __call__(self) -> Doc:
+        if self._doc is None:
+            self._doc = _nlp()(self.text)
+        return self._doc
+
 class SMSParseError(Exception):
     """Custom exception for SMS parsing failures"""
     pass
 
-def is_transactional_message(text: str) -> bool:
+def is_transactional_message(text: str, text_lower: Optional[str] = None) -> bool:
     """
     Determine if the message represents an actual financial transaction
     
     Returns True for transactional messages, False for informational/promotional messages
     """
-    text_lower = text.lower()
+    text_lower = text.lower() if text_lower is None else text_lower
     
     # 1. Check for explicit transaction indicators
     if FINANCIAL_PATTERNS["transaction_indicators"].search(text_lower):
         return True
     
-    # 2. Check for common transaction verbs in context
-    transaction_verbs = {"pay", "send", "transfer", "spend", "use", "purchase", "withdraw", "recharge"}
-    doc = nlp(text_lower)
-    
-    for token in doc:
-        if token.lemma_ in transaction_verbs and token.pos_ == "VERB":
+    # 2. Check for amount patterns with transaction context
+    for indicator in _AMOUNT_INDICATOR_PAT.finditer(text_lower):
+        # Check if there's an amount after the indicator
+        pos = indicator.end()
+        if _NUMBER.search(text_lower, pos, pos + 30):
             return True
     
-    # 3. Check for amount patterns with transaction context
-    amount_indicators = ["by", "of", "for", "rs", "inr", "amount", "charged"]
-    for indicator in amount_indicators:
-        if indicator in text_lower:
-            # Check if there's an amount after the indicator
-            pos = text_lower.find(indicator) + len(indicator)
-            if pos < len(text_lower):
-                context = text_lower[pos:pos+30]
-                if re.search(r"\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{1,2})?", context):
-                    return True
-    
-    # 4. Check for reference numbers which often indicate transactions
+    # 3. Check for reference numbers which often indicate transactions
     if FINANCIAL_PATTERNS["reference"].search(text_lower):
         return True
     
-    # 5. If we've reached here, it's likely informational
+    # 4. If we've reached here, it's likely informational
     return False
 
-def detect_category(text: str) -> Tuple[str, str, float]:
+def detect_category(text: str, text_lower: Optional[str] = None) -> Tuple[str, str, float]:
     """
     Determine transaction category with comprehensive financial awareness
     
+    Apart from keyword digits like "kotak 811", the category depends on where
+    digits appear but never on their values, so results are memoized per
+    template: SMS differing only in amounts, dates or account numbers share one
+    cache entry.
+    
     Returns:
         (primary_category, subcategory, confidence_score)
     """
-    text_lower = re.sub(r"[^\w\s]", " ", text.lower())
-    text_lower = re.sub(r"\s+", " ", text_lower).strip()
+    text_lower = text.lower() if text_lower is None else text_lower
+    if any(run in text_lower for run in _KEYWORD_DIGITS):
+        return _detect_category(text_lower)
+    return _detect_category(_DIGIT.sub("0", text_lower))
+
+@lru_cache(maxsize=8192)
+def _detect_category(text_lower: str) -> Tuple[str, str, float]:
+    text_norm = _PUNCTUATION.sub(" ", text_lower)
+    text_norm = _WHITESPACE.sub(" ", text_norm).strip()
     
     # 1. Check if this is even a transactional message
-    if not is_transactional_message(text):
+    if not is_transactional_message(text_lower, text_lower):
         return "informational", "general", 0.95
     
+    # Collect every keyword/exception/provider hit in one pass over the text
+    keyword_hits = set()
+    exception_hits = set()
+    provider_hits = set()
+    for _, matches in CATEGORY_AUTOMATON.iter(text_norm):
+        for category, role, payload in matches:
+            if role == "keyword":
+                keyword_hits.add(category)
+            elif role == "exception":
+                exception_hits.add(category)
+            else:
+                provider_hits.add((category, payload))
+    
     # 2. Check for specialized categories first (loan, investment, insurance, etc.)
-    for category, config in TRANSACTION_CATEGORIES.items():
-        if category in ["credit", "debit", "informational"]:
-            continue  # Skip basic categories for now
+    for category in _SPECIALIZED_CATEGORIES:
+        if category in keyword_hits:
+            # Loans are labelled by provider, "generic" when none is identified
+            subcategory = "generic" if category == "loan" else ""
+            
+            # Verify context if needed
+            if category in CATEGORY_CONTEXT_REGEX:
+                if CATEGORY_CONTEXT_REGEX[category].search(text_norm):
+                    # Check for specific providers where applicable
+                    if category == "loan":
+                        for provider in _LOAN_PROVIDERS:
+                            if (category, provider) in provider_hits:
+                                return category, provider, 0.95
+                    return category, subcategory, 0.90
             
-        # Check keywords
-        if "keywords" in config:
-            for kw in config["keywords"]:
-                if kw in text_lower:
-                    # Verify context if needed
-                    if "context_phrases" in config:
-                        if any(re.search(pattern, text_lower) for pattern in config["context_phrases"]):
-                            # Check for specific providers where applicable
-                            if category == "loan" and "providers" in config:
-                                for provider, aliases in config["providers"].items():
-                                    for alias in aliases:
-                                        if alias in text_lower:
-                                            return category, provider, 0.95
-                            return category, "", 0.90
-                    
-                    # No context verification needed
-                    return category, "", 0.85
-    
-    # 3. Check for loan category with provider identification
-    if "loan" in TRANSACTION_CATEGORIES:
-        loan_config = TRANSACTION_CATEGORIES["loan"]
-        for kw in loan_config["keywords"]:
-            if kw in text_lower:
-                if any(re.search(pattern, text_lower) for pattern in loan_config["context_phrases"]):
-                    # Identify specific loan provider
-                    for provider, aliases in loan_config["providers"].items():
-                        for alias in aliases:
-                            if alias in text_lower:
-                                return "loan", provider, 0.95
-                    return "loan", "generic", 0.90
-    
-    # 4. Check for credit indicators
-    credit_config = TRANSACTION_CATEGORIES["credit"]
-    for kw in credit_config["keywords"]:
-        if kw in text_lower:
-            # Check exceptions
-            if not any(exc in text_lower for exc in credit_config["exceptions"]):
-                # Special handling for EMI-related credits
-                if "emi" in text_lower and "credit" in text_lower:
-                    return "emi", "credit", 0.85
-                return "credit", "", 0.80
-    
-    # 5. Check for debit indicators
-    debit_config = TRANSACTION_CATEGORIES["debit"]
-    for kw in debit_config["keywords"]:
-        if kw in text_lower:
-            # Check exceptions
-            if not any(exc in text_lower for exc in debit_config["exceptions"]):
-                # Special handling for EMI payments
-                if "emi" in text_lower:
-                    return "emi", "debit", 0.85
-                # Identify transaction method
-                if "upi" in text_lower:
-                    return "debit", "upi", 0.80
-                if "atm" in text_lower:
-                    return "debit", "atm", 0.80
-                if "pos" in text_lower or "swipe" in text_lower:
-                    return "debit", "pos", 0.80
-                return "debit", "general", 0.75
-    
-    # 6. Fallback to debit as most common transaction type
+            # No context verification needed
+            return category, subcategory, 0.85
+    
+    # 3. Check for credit indicators
+    if "credit" in keyword_hits and "credit" not in exception_hits:
+        # Special handling for EMI-related credits
+        if "emi" in text_norm and "credit" in text_norm:
+            return "emi", "credit", 0.85
+        return "credit", "", 0.80
+    
+    # 4. Check for debit indicators
+    if "debit" in keyword_hits and "debit" not in exception_hits:
+        # Special handling for EMI payments
+        if "emi" in text_norm:
+            return "emi", "debit", 0.85
+        # Identify transaction method
+        if "upi" in text_norm:
+            return "debit", "upi", 0.80
+        if "atm" in text_norm:
+            return "debit", "atm", 0.80
+        if "pos" in text_norm or "swipe" in text_norm:
+            return "debit", "pos", 0.80
+        return "debit", "general", 0.75
+    
+    # 5. Fallback to debit as most common transaction type
     return "debit", "general", 0.70
 
-def extract_amount(text: str) -> Optional[Dict[str, object]]:
+def extract_amount(text: str, get_doc: Optional[Callable[[], Doc]] = None, text_lower: Optional[str] = None) -> Optional[Dict[str, object]]:
     """
     Extract amount with proper context awareness to avoid account number confusion
     
@@ -307,56 +515,43 @@ def extract_amount(text: str) -> Optional[Dict[str, object]]:
     2. Specifically avoids matching account numbers (like X6072)
     3. Uses multiple validation checks to ensure we get the correct amount
     """
-    text_lower = text.lower()
+    text_lower = text.lower() if text_lower is None else text_lower
     
     # 1. Priority: Amount after transaction indicators with context
-    transaction_indicators = ["by", "of", "for", "rs", "inr", "amount", "charged", "debited", "credited"]
-    
     amounts = []
     
-    for indicator in transaction_indicators:
-        if indicator in text_lower:
-            # Find the position of the indicator
-            pos = text_lower.find(indicator) + len(indicator)
-            # Look for amount pattern in the next 30 characters
-            context = text[pos:pos+30]
-            
-            # Improved amount pattern that requires proper amount formatting
-            amount_pattern = r"(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?|\d+\.\d{1,2}|\d+)"
-            if match := re.search(amount_pattern, context):
-                amount_str = match.group(1).replace(",", "")
-                try:
-                    amount = float(amount_str)
-                    # Validate amount is reasonable for a transaction
-                    if 1 <= amount <= 10_000_000:
-                        # CRITICAL FIX: Check if this is likely an account number (preceded by X or #)
-                        actual_pos = pos + match.start()
-                        if actual_pos > 0:
-                            prev_char = text[actual_pos - 1]
-                            if prev_char in ["X", "x", "#"]:
-                                continue  # Skip account numbers
-                        
-                        # Additional check: Ensure amount is properly separated
-                        if actual_pos + len(match.group(0)) < len(text):
-                            next_char = text[actual_pos + len(match.group(0))]
-                            if not next_char.isspace() and next_char not in [".", ",", ")", "]", "}"]:
-                                continue
-                        
-                        amounts.append((amount, actual_pos))
-                except (ValueError, TypeError):
-                    continue
+    # One pass over every indicator occurrence, not just the first of each
+    for indicator in _AMOUNT_INDICATOR_PAT.finditer(text_lower):
+        pos = indicator.end()
+        # Look for amount pattern in the next 30 characters
+        # Improved amount pattern that requires proper amount formatting
+        if match := _AMOUNT_PAT.search(text, pos, pos + 30):
+            amount_str = match.group(1).replace(",", "")
+            # The pattern only captures digits, ',' groups and one '.', so float() can't fail
+            amount = float(amount_str)
+            # Validate amount is reasonable for a transaction
+            if 1 <= amount <= 10_000_000:
+                # CRITICAL FIX: Check if this is likely an account number (preceded by X or #)
+                actual_pos = match.start()
+                if actual_pos > 0:
+                    prev_char = text[actual_pos - 1]
+                    if prev_char in ["X", "x", "#"]:
+                        continue  # Skip account numbers
+                
+                # Additional check: Ensure amount is properly separated
+                if match.end() < len(text):
+                    next_char = text[match.end()]
+                    if not next_char.isspace() and next_char not in [".", ",", ")", "]", "}"]:
+                        continue
+                
+                amounts.append((amount, actual_pos))
     
     # Sort by position (earlier in text is more likely to be the transaction amount)
     if amounts:
         amounts.sort(key=lambda x: x[1])
         amount, _ = amounts[0]
         
-        # Find currency
-        currency = "INR"
-        for currency_name, code in CURRENCY_CODES.items():
-            if currency_name in text_lower:
-                currency = code
-                break
+        currency = _detect_currency(text_lower)
         
         return {
             "value": amount,
@@ -365,90 +560,79 @@ def extract_amount(text: str) -> Optional[Dict[str, object]]:
         }
     
     # 2. Look for MONEY entities with transaction context
-    doc = nlp(text)
+    get_doc = get_doc or LazyDoc(text)
+    doc = get_doc()
     for ent in doc.ents:
         if ent.label_ == "MONEY":
             # Verify it's near transaction keywords
             start_idx = max(0, ent.start_char - 50)
             context = text_lower[start_idx:ent.start_char]
-            if any(kw in context for kw in transaction_indicators):
-                clean_amt = re.sub(r"[^\d.]", "", ent.text)
-                if clean_amt.replace(".", "", 1).isdigit():
-                    try:
-                        amount = float(clean_amt)
-                        if 1 <= amount <= 10_000_000:
-                            # Find currency
-                            currency = "INR"
-                            for currency_name, code in CURRENCY_CODES.items():
-                                if currency_name in text_lower:
-                                    currency = code
-                                    break
-                            
-                            return {
-                                "value": amount,
-                                "currency": currency,
-                                "formatted": f"{currency} {amount:,.2f}"
-                            }
-                    except (ValueError, TypeError):
-                        continue
+            if _AMOUNT_INDICATOR_PAT.search(context):
+                clean_amt = _NON_NUMERIC.sub("", ent.text)
+                if clean_amt.replace(".", "", 1).isdecimal():
+                    amount = float(clean_amt)
+                    if 1 <= amount <= 10_000_000:
+                        currency = _detect_currency(text_lower)
+                        
+                        return {
+                            "value": amount,
+                            "currency": currency,
+                            "formatted": f"{currency} {amount:,.2f}"
+                        }
     
     # 3. Fallback: Scan for amounts with more context awareness
-    amount_pattern = r"(?:rs\.?\s*|inr\s*)(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?)\b"
-    if match := re.search(amount_pattern, text_lower):
-        try:
-            amount = float(match.group(1).replace(",", ""))
-            if 1 <= amount <= 10_000_000:
-                currency = "INR"
-                for currency_name, code in CURRENCY_CODES.items():
-                    if currency_name in text_lower:
-                        currency = code
-                        break
-                
-                return {
-                    "value": amount,
-                    "currency": currency,
-                    "formatted": f"{currency} {amount:,.2f}"
-                }
-        except (ValueError, TypeError):
-            pass
+    if match := _AMOUNT_FALLBACK_PAT.search(text_lower):
+        amount = float(match.group(1).replace(",", ""))
+        if 1 <= amount <= 10_000_000:
+            currency = _detect_currency(text_lower)
+            
+            return {
+                "value": amount,
+                "currency": currency,
+                "formatted": f"{currency} {amount:,.2f}"
+            }
     
     # 4. Last resort: Find any numeric value that looks like an amount
     # CRITICAL FIX: Added account number protection
-    for token in nlp(text):
-        if token.like_num and token.ent_type_ != "DATE":
-            try:
-                amount = float(token.text.replace(",", ""))
-                # Skip account numbers (X1234 pattern)
-                if token.i > 0 and re.match(r"^[a-zA-Z]$", token.doc[token.i-1].text):
-                    continue
-                if 1 <= amount <= 10_000_000:
-                    return {
-                        "value": amount,
-                        "currency": "INR",
-                        "formatted": f"INR {amount:,.2f}"
-                    }
-            except (ValueError, TypeError):
-                continue
+    doc = get_doc()
+    # Select number-like, non-DATE tokens on the attribute arrays rather than per token
+    attrs = doc.to_array([LIKE_NUM, ENT_TYPE])
+    for i in np.flatnonzero((attrs[:, 0] == 1) & (attrs[:, 1] != _DATE_ENT_TYPE)):
+        token = doc[int(i)]
+        # like_num also accepts words ("ten"), fractions ("1/2") and digits like "²" that float() rejects
+        amount_str = token.text.replace(",", "")
+        if not amount_str.replace(".", "", 1).isdecimal():
+            continue
+        amount = float(amount_str)
+        # Skip account numbers (X1234 pattern)
+        if token.i > 0 and _SINGLE_LETTER.match(doc[token.i-1].text):
+            continue
+        if 1 <= amount <= 10_000_000:
+            return {
+                "value": amount,
+                "currency": "INR",
+                "formatted": f"INR {amount:,.2f}"
+            }
     
     return None
 
-def extract_merchant(text: str, category: str, subcategory: str) -> Optional[str]:
+def extract_merchant(text: str, category: str, subcategory: str, get_doc: Optional[Callable[[], Doc]] = None, text_lower: Optional[str] = None) -> Optional[str]:
     """Extract merchant with comprehensive financial context handling"""
-    text_lower = text.lower()
+    text_lower = text.lower() if text_lower is None else text_lower
     
     # 1. For informational messages, return None or relevant entity
     if category == "informational":
         # Extract the company/app name if it's a promotional message
         if "app" in text_lower or "buy" in text_lower or "sell" in text_lower:
             # Look for app name patterns
-            if match := re.search(r"on your ([a-zA-Z]+) App", text, re.IGNORECASE):
+            if match := _APP_NAME_PAT.search(text):
                 return f"{match.group(1)} App"
-            if match := re.search(r"only on ([a-zA-Z]+)", text, re.IGNORECASE):
+            if match := _ONLY_ON_PAT.search(text):
                 return f"{match.group(1)} App"
         # For balance updates, return the institution name
         if "balance" in text_lower or "fund" in text_lower:
             # Extract the institution name
-            if match := re.search(r"^([A-Z\s]+) on", text):
+            if match := _INSTITUTION_PAT.search(text):
                 return match.group(1).strip()
         return None
     
@@ -457,40 +641,29 @@ def extract_merchant(text: str, category: str, subcategory: str) -> Optional[str
         return f"{subcategory.title()} Loan"
     
     if category == "recharge":
-        for provider in TRANSACTION_CATEGORIES["recharge"]["providers"]:
-            if provider in text_lower:
-                return f"{provider.title()} Recharge"
+        if provider := _find_provider("recharge", text_lower):
+            return f"{provider.title()} Recharge"
         return "Mobile Recharge"
     
     if category == "insurance":
-        for provider in TRANSACTION_CATEGORIES["insurance"]["providers"]:
-            if provider in text_lower:
-                return f"{provider.title()} Insurance"
+        if provider := _find_provider("insurance", text_lower):
+            return f"{provider.title()} Insurance"
         return "Insurance Premium"
     
     if category == "investment":
-        investment_providers = ["groww", "coin", "zerodha", "upstox", "mf utility"]
-        for provider in investment_providers:
-            if provider in text_lower:
-                return f"{provider.title()} Investment"
+        if provider := _find_provider("investment", text_lower):
+            return f"{provider.title()} Investment"
         return "Investment"
     
     # 3. UPI transaction merchant extraction
     if category == "debit" and subcategory == "upi":
         # Look for patterns like "trf to MERCHANT" or "sent to MERCHANT"
-        upi_patterns = [
-            r"trf\s+to\s+([a-zA-Z0-9\s]{3,30})", 
-            r"sent\s+to\s+([a-zA-Z0-9\s]{3,30})",
-            r"paid\s+to\s+([a-zA-Z0-9\s]{3,30})",
-            r"transfer\s+to\s+([a-zA-Z0-9\s]{3,30})"
-        ]
-        
-        for pattern in upi_patterns:
-            if match := re.search(pattern, text, re.IGNORECASE):
+        for pattern in _UPI_PATS:
+            if match := pattern.search(text):
                 merchant = match.group(1).strip()
                 # Clean up merchant name
-                merchant = re.sub(r"\s+Ref.*$", "", merchant)
-                merchant = re.sub(r"\s+(?:UPI|ref|id|crn).*", "", merchant)
+                merchant = _UPI_REF_SUFFIX.sub("", merchant)
+                merchant = _UPI_ID_SUFFIX.sub("", merchant)
                 return merchant.title()
     
     # 4. General merchant extraction
@@ -502,8 +675,8 @@ def extract_merchant(text: str, category: str, subcategory: str) -> Optional[str
                 # Extract next 2-5 words as potential merchant
                 candidate = text[pos:pos+50]
                 # Remove reference numbers, amounts, and blacklisted terms
-                candidate = re.sub(r"\b(?:ref|id|user|upi|rs|inr|amount|charged)\b.*", "", candidate, flags=re.IGNORECASE)
-                candidate = re.sub(r"[^\w\s]", " ", candidate)
+                candidate = _MERCHANT_STOPWORDS.sub("", candidate)
+                candidate = _PUNCTUATION.sub(" ", candidate)
                 words = [
                     w.capitalize() for w in candidate.split()[:5] 
                     if w.lower() not in MERCHANT_BLACKLIST and len(w) > 1
@@ -513,18 +686,24 @@ def extract_merchant(text: str, category: str, subcategory: str) -> Optional[str
     
     # 5. Fallback: Look for proper nouns after transaction verbs
     transaction_verbs = {"pay", "send", "transfer", "spend", "use", "purchase", "withdraw", "recharge"}
-    doc = nlp(text)
-    
-    for token in doc:
-        if token.lemma_ in transaction_verbs and token.pos_ == "VERB":
-            for chunk in doc.noun_chunks:
-                if chunk.root.head == token and chunk.root.dep_ in ("dobj", "pobj"):
-                    words = [
-                        w.text.capitalize() for w in chunk 
-                        if w.text.lower() not in MERCHANT_BLACKLIST
-                    ]
-                    if words:
-                        return " ".join(words)
+    doc = (get_doc or LazyDoc(text))()
+    
+    verbs = [token for token in doc if token.lemma_ in transaction_verbs and token.pos_ == "VERB"]
+    if verbs:
+        # Walk the noun chunks once, grouping object chunks by their head token
+        objects: Dict[int, List] = {}
+        for chunk in doc.noun_chunks:
+            if chunk.root.dep_ in ("dobj", "pobj"):
+                objects.setdefault(chunk.root.head.i, []).append(chunk)
+        
+        for token in verbs:
+            for chunk in objects.get(token.i, []):
+                words = [
+                    w.text.capitalize() for w in chunk 
+                    if w.text.lower() not in MERCHANT_BLACKLIST
+                ]
+                if words:
+                    return " ".join(words)
     
     # 6. Default merchants for known transaction types
     if "atm" in text_lower:
@@ -536,9 +715,25 @@ def extract_merchant(text: str, category: str, subcategory: str) -> Optional[str
     
     return "Merchant"
 
-def extract_date(text: str, sms_timestamp: Optional[datetime] = None) -> Optional[str]:
+def _iso_date(day: int, month: Optional[int], year_text: str) -> Optional[str]:
+    """Validate a day/month/year triple and format it as YYYY-MM-DD"""
+    # Handle 2-digit vs 4-digit years by digit count, so "025" is rejected like
+    # "%Y" would rather than read as 2025
+    year = int(year_text)
+    if len(year_text) == 2:
+        year += 2000 if year < 50 else 1900
+    elif len(year_text) != 4:
+        return None
+    if month is None:
+        return None
+    try:
+        return datetime(year, month, day).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+def extract_date(text: str, sms_timestamp: Optional[datetime] = None, text_lower: Optional[str] = None) -> Optional[str]:
     """Extract date with comprehensive global format support"""
-    text_lower = text.lower()
+    text_lower = text.lower() if text_lower is None else text_lower
     
     # 1. Handle relative dates first
     relative_dates = {
@@ -558,37 +753,25 @@ def extract_date(text: str, sms_timestamp: Optional[datetime] = None) -> Optiona
     # 2. Compact date patterns (15May25, 02Aug25)
     if match := FINANCIAL_PATTERNS["date_compact"].search(text):
         day, month_abbr, year = match.groups()
-        # Handle 2-digit vs 4-digit years
-        if len(year) == 2:
-            year = f"20{year}" if int(year) < 50 else f"19{year}"
-        try:
-            return datetime.strptime(f"{day} {month_abbr} {year}", "%d %b %Y").strftime("%Y-%m-%d")
-        except ValueError:
-            pass
+        if date := _iso_date(int(day), _MONTH_ABBR.get(month_abbr.lower()), year):
+            return date
     
     # 3. Standard date formats (dd/mm/yy, dd-mm-yyyy, etc.)
     if match := FINANCIAL_PATTERNS["date_standard"].search(text):
-        parts = match.groups()
-        # Try different interpretations based on locale
-        for fmt in ["%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y", "%d.%m.%Y", "%m.%d.%Y"]:
-            try:
-                # Handle 2-digit years
-                if len(parts[2]) == 2:
-                    parts = (parts[0], parts[1], f"20{parts[2]}" if int(parts[2]) < 50 else f"19{parts[2]}")
-                return datetime.strptime(f"{parts[0]} {parts[1]} {parts[2]}", fmt.replace("/", " ").replace("-", " ")).strftime("%Y-%m-%d")
-            except ValueError:
-                continue
+        day_text, month_text, year = match.groups()
+        day, month = int(day_text), int(month_text)
+        # Day-first is the common SMS locale; read month-first only when the
+        # second part can't be a month
+        if month > 12:
+            day, month = month, day
+        if date := _iso_date(day, month, year):
+            return date
     
     # 4. Verbose date formats (15 May 2025)
     if match := FINANCIAL_PATTERNS["date_verbose"].search(text):
         day, month, year = match.groups()
-        try:
-            return datetime.strptime(f"{day} {month} {year}", "%d %B %Y").strftime("%Y-%m-%d")
-        except ValueError:
-            try:
-                return datetime.strptime(f"{day} {month} {year}", "%d %b %Y").strftime("%Y-%m-%d")
-            except ValueError:
-                pass
+        if date := _iso_date(int(day), _MONTHS.get(month.lower()), year):
+            return date
     
     # 5. Date indicators + next tokens
     date_indicators = ["on", "date", "for", "by", "at"]
@@ -596,11 +779,10 @@ def extract_date(text: str, sms_timestamp: Optional[datetime] = None) -> Optiona
         if (pos := text_lower.find(indicator)) != -1:
             date_candidate = text[pos + len(indicator):pos + len(indicator) + 30]
             # Try to find date patterns in the candidate text
-            if match := re.search(r"(\d{1,2})\s+([a-z]{3,9})\s+(\d{4})", date_candidate, re.IGNORECASE):
-                try:
-                    return datetime.strptime(f"{match.group(1)} {match.group(2)} {match.group(3)}", "%d %b %Y").strftime("%Y-%m-%d")
-                except ValueError:
-                    pass
+            if match := FINANCIAL_PATTERNS["date_verbose"].search(date_candidate):
+                day, month, year = match.groups()
+                if date := _iso_date(int(day), _MONTH_ABBR.get(month.lower()), year):
+                    return date
     
     # 6. Fallback to SMS timestamp or today
     return (sms_timestamp or datetime.now()).strftime("%Y-%m-%d")
@@ -614,11 +796,9 @@ def extract_balance(text: str) -> Optional[Dict[str, object]]:
         currency = match.group(1) if match.group(1) else "INR"
         amount_str = match.group(2).replace(",", "")
         
-        try:
-            amount = float(amount_str)
-            balances.append((amount, currency, match.start()))
-        except (ValueError, TypeError):
-            continue
+        # "1.234.567" style grouping leaves more than one '.'
+        if amount_str.replace(".", "", 1).isdecimal():
+            balances.append((float(amount_str), currency, match.start()))
     
     # 2. Return the most relevant balance (usually the one closest to "available")
     if balances:
@@ -637,11 +817,8 @@ def extract_balance(text: str) -> Optional[Dict[str, object]]:
 def extract_reference(text: str) -> Optional[str]:
     """Extract transaction reference number if present"""
     if match := FINANCIAL_PATTERNS["reference"].search(text):
-        ref = match.group(0)
-        # Clean up reference format
-        ref = re.sub(r"[:\-]\s*", " ", ref)
-        ref = re.sub(r"\s+", " ", ref)
-        return ref.strip().upper()
+        # Clean up reference format: separators and whitespace runs become one space
+        return _REF_SEPARATOR.sub(" ", match.group(0)).strip().upper()
     return None
 
 def parse_sms_spacy(sms_text: str, sms_timestamp: Optional[datetime] = None) -> Dict:
@@ -655,12 +832,38 @@ def parse_sms_spacy(sms_text: str, sms_timestamp: Optional[datetime] = None) ->
     Returns:
         Structured transaction dictionary with comprehensive financial data
     """
+    # spaCy runs at most once per SMS, and only if a step needs it
+    return _parse_sms(sms_text, sms_timestamp, LazyDoc(sms_text))
+
+def _parse_sms(sms_text: str, sms_timestamp: Optional[datetime], get_doc: LazyDoc) -> Dict:
     if not sms_text or not sms_text.strip():
         raise SMSParseError("Empty SMS content")
     
+    # Known bank templates are parsed deterministically without spaCy
+    if fields := match_template(sms_text):
+        return {
+            "raw_text": sms_text,
+            "category": fields["category"],
+            "subcategory": fields["subcategory"],
+            "amount": fields["amount"],
+            "currency": fields["currency"],
+            "formatted_amount": f"{fields['currency']} {fields['amount']:,.2f}",
+            "merchant": fields["merchant"],
+            "date": fields["date"],
+            "balance": extract_balance(sms_text),
+            "reference": extract_reference(sms_text),
+            "description": sms_text,
+            "parser": "template_v1",
+            "timestamp": datetime.now().isoformat(),
+            "confidence": fields["confidence"]
+        }
+    
+    # Lowercased once and shared by every extractor
+    text_lower = sms_text.lower()
+    
     try:
         # 1. Detect transaction category
-        category, subcategory, confidence = detect_category(sms_text)
+        category, subcategory, confidence = detect_category(sms_text, text_lower)
         
         # 2. Extract financial data
         amount = None
@@ -669,11 +872,13 @@ def parse_sms_spacy(sms_text: str, sms_timestamp: Optional[datetime] = None) ->
         
         # Only extract transactional data for actual transactions
         if category != "informational":
-            amount = extract_amount(sms_text)
-            merchant = extract_merchant(sms_text, category, subcategory)
+            amount = extract_amount(sms_text, get_doc, text_lower)
+            merchant = extract_merchant(sms_text, category, subcategory, get_doc, text_lower)
             reference = extract_reference(sms_text)
         
-        transaction_date = extract_date(sms_text, sms_timestamp)
+        # Informational SMS get these too (both are regex-only): a date in the
+        # text beats the timestamp fallback, and the response carries the balance
+        transaction_date = extract_date(sms_text, sms_timestamp, text_lower)
         balance = extract_balance(sms_text)
         
         # 3. Prepare comprehensive response
@@ -703,14 +908,63 @@ def parse_sms_spacy(sms_text: str, sms_timestamp: Optional[datetime] = None) ->
             result["insurance_provider"] = subcategory or merchant
         elif category == "informational":
             # Add additional fields for informational messages
-            if "price" in sms_text.lower() or "rate" in sms_text.lower():
+            if "price" in text_lower or "rate" in text_lower:
                 result["info_type"] = "market_update"
-            elif "balance" in sms_text.lower() or "fund" in sms_text.lower():
+            elif "balance" in text_lower or "fund" in text_lower:
                 result["info_type"] = "balance_update"
-            elif "offer" in sms_text.lower() or "deal" in sms_text.lower() or "buy" in sms_text.lower():
+            elif "offer" in text_lower or "deal" in text_lower or "buy" in text_lower:
                 result["info_type"] = "promotion"
         
         return result
     
     except Exception as e:
-        raise SMSParseError(f"Universal SMS parsing failed: {str(e)}") from e
\ No newline at end of file
+        raise SMSParseError(f"Universal SMS parsing failed: {str(e)}") from e
+
+def _needs_doc(sms_text: str) -> bool:
+    """Whether parsing the SMS can reach a spaCy step (template hits and informational SMS never do)"""
+    if not sms_text or not sms_text.strip() or match_template(sms_text):
+        return False
+    return detect_category(sms_text)[0] != "informational"
+
+def parse_sms_batch(
+    sms_texts: List[str],
+    timestamps: Optional[List[Optional[datetime]]] = None,
+    batch_size: int = SPACY_BATCH_SIZE,
+    n_process: int = 1
+) -> List[Union[Dict, SMSParseError]]:
+    """
+    Parse many SMS at once, running spaCy over them with nlp.pipe
+    
+    Args:
+        sms_texts: Raw SMS contents
+        timestamps: Optional per-SMS timestamps, aligned with sms_texts
+        batch_size: Number of SMS spaCy processes per batch
+        n_process: spaCy worker processes (keep at 1 inside the app's executor)
+        
+    Returns:
+        One entry per input, in input order: the parsed transaction dictionary,
+        or the SMSParseError raised for that message so one bad SMS doesn't fail the batch
+        
+    Raises:
+        ValueError: If timestamps is given with a different length than sms_texts
+    """
+    if timestamps is None:
+        timestamps = [None] * len(sms_texts)
+    elif len(timestamps) != len(sms_texts):
+        raise ValueError(f"Got {len(timestamps)} timestamps for {len(sms_texts)} SMS")
+    # Only SMS that can reach an NLP step are fed through spaCy
+    needs_doc = [_needs_doc(sms_text) for sms_text in sms_texts]
+    docs = _nlp().pipe(
+        [sms_text for sms_text, needed in zip(sms_texts, needs_doc) if needed],
+        batch_size=batch_size,
+        n_process=n_process
+    )
+    
+    results = []
+    for sms_text, sms_timestamp, needed in zip(sms_texts, timestamps, needs_doc):
+        doc = next(docs) if needed else None
+        try:
+            results.append(_parse_sms(sms_text, sms_timestamp, LazyDoc(sms_text, doc)))
+        except SMSParseError as e:
+            results.append(e)
+    return results
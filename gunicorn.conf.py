@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+# Production server: gunicorn app.main:app -c gunicorn.conf.py
+import os
+
+# CPUs this process may run on (a container's --cpuset-cpus, taskset, ...),
+# which can be fewer than, and differently numbered from, the host's
+if hasattr(os, "sched_getaffinity"):
+    CPUS = sorted(os.sched_getaffinity(0))
+else:
+    CPUS = list(range(os.cpu_count() or 1))
+
+bind = "0.0.0.0:8000"
+workers = 2 * len(CPUS) + 1
+worker_class = "uvicorn_worker.UvicornWorker"
+keepalive = 30
+
+# Import the app (and load the spaCy model) once in the master; forked workers
+# share the model's memory copy-on-write instead of each loading their own
+preload_app = True
+
+# Gunicorn workers already spread over the cores, so each one gets a single
+# parser process rather than a pool sized to the whole machine. Set here rather
+# than via raw_env, which would override a value the operator exported.
+os.environ.setdefault("FINAPP_PARSE_WORKERS", "1")
+
+
+def post_fork(server, worker):
+    # Pin each worker (and the parser process it spawns) to its own core
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {CPUS[worker.age % len(CPUS)]})
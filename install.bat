@@ -48,9 +48,9 @@ echo ✅ Dependencies installed
 REM Download spaCy model
 echo 🧠 Downloading spaCy language model...
 if "%USE_UV%"=="true" (
-    uv run python -m spacy download en_core_web_lg
+    uv run python -m spacy download en_core_web_sm
 ) else (
-    python -m spacy download en_core_web_lg
+    python -m spacy download en_core_web_sm
 )
 echo ✅ spaCy model downloaded
 
@@ -54,9 +54,9 @@ echo "✅ Dependencies installed"
 # Download spaCy model
 echo "🧠 Downloading spaCy language model..."
 if [ "$USE_UV" = true ]; then
-    uv run python -m spacy download en_core_web_lg
+    uv run python -m spacy download en_core_web_sm
 else
-    python -m spacy download en_core_web_lg
+    python -m spacy download en_core_web_sm
 fi
 echo "✅ spaCy model downloaded"
 